@@ -1,13 +1,21 @@
-import time
-import requests
-import statistics
+import asyncio
+import numpy as np
 import os
+import time
+from scipy import stats as scipy_stats
+from hdrh.histogram import HdrHistogram
+
+import sentinel_client
 
 # --- CONFIG ---
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-SENTINEL_URL = "http://localhost:3000/v1/chat/completions"
+SENTINEL_URL = sentinel_client.CHAT_URL
 DIRECT_URL = "https://api.openai.com/v1/chat/completions"
-NUM_TESTS = 5
+# 5 samples made p95 meaningless (it was just the max). 200 samples after
+# a warmup burn-in (TLS handshake, DNS, connection pool fill) gets the
+# coefficient of variation low enough that "<20ms overhead" is defensible.
+WARMUP = 5
+NUM_TESTS = 200
 
 payload = {
     "model": "gpt-4o-mini",
@@ -19,44 +27,184 @@ headers = {
     "Content-Type": "application/json"
 }
 
-def measure_call(url):
-    start = time.perf_counter()
+# Encode once at import: the payload never changes, and orjson (Rust,
+# SIMD UTF-8) beats the stdlib encoder by ~5-10x anyway.
+BODY = sentinel_client.encode(payload)
+
+# Samples live in pre-allocated float64 arrays (contiguous, one write per
+# call); failed calls stay NaN and are masked out before any stats.
+def new_samples():
+    return np.full(NUM_TESTS, np.nan, dtype=np.float64)
+
+def print_summary(label, xs):
+    n = xs.size
+    median = np.median(xs)
+    p25, p75 = np.percentile(xs, [25, 75])
+    # 95% CI on the mean: x̄ ± t·s/√n
+    ci = scipy_stats.t.ppf(0.975, n - 1) * xs.std(ddof=1) / np.sqrt(n) if n > 1 else 0.0
+    print(f"{label} mean = {xs.mean():.2f}ms ± {ci:.2f} (95% CI), median = {median:.2f}ms, IQR = {p75 - p25:.2f}ms")
+
+# Latencies go into fixed-memory log-bucketed histograms (1µs–60s range,
+# 3 significant figures): any percentile is an O(1) lookup, so sample
+# counts can grow to 10⁶+ without sort costs or GC pressure.
+def new_histogram():
+    return HdrHistogram(1, 60_000_000, 3)
+
+def print_percentiles(label, hist):
+    if hist.get_total_count() < 20:
+        # Too few samples for a meaningful tail — everything above p50
+        # would just be the max anyway.
+        p50 = hist.get_value_at_percentile(50) / 1e3
+        print(f"{label} p50 = {p50:.2f}ms, max = {hist.get_max_value() / 1e3:.2f}ms "
+              f"(N={hist.get_total_count()} too small for tails)")
+        return
+    ps = [hist.get_value_at_percentile(p) / 1e3 for p in (50, 90, 95, 99, 99.9)]
+    print(f"{label} p50/p90/p95/p99/p99.9 = " + "/".join(f"{p:.2f}" for p in ps) + "ms")
+
+# Core the benchmark gets pinned to; pick one away from core 0 where
+# interrupt handling tends to land.
+BENCH_CORE = 3
+
+def stabilize_environment():
+    """Best-effort measurement isolation (Linux only, never fatal)."""
+    if not hasattr(os, "sched_setaffinity"):
+        return
+    try:
+        os.sched_setaffinity(0, {BENCH_CORE})
+    except OSError:
+        print(f"⚠️  Could not pin to CPU {BENCH_CORE}; expect more run-to-run variance.")
+    try:
+        with open(f"/sys/devices/system/cpu/cpu{BENCH_CORE}/cpufreq/scaling_governor") as f:
+            governor = f.read().strip()
+        if governor != "performance":
+            print(f"⚠️  CPU governor is '{governor}' (want 'performance'); frequency scaling will add noise.")
+    except OSError:
+        pass
+    try:
+        os.nice(-5)
+    except OSError:
+        pass  # needs privileges, fine without
+
+if hasattr(time, "CLOCK_MONOTONIC_RAW"):
+    def _now():
+        # Raw monotonic clock: not slewed by NTP frequency adjustments,
+        # unlike the CLOCK_MONOTONIC behind perf_counter.
+        return time.clock_gettime_ns(time.CLOCK_MONOTONIC_RAW)
+else:
+    def _now():
+        return time.perf_counter_ns()  # monotonic, ns resolution
+
+def _cpu():
+    # CPU time of the event-loop thread. All probes run as coroutines on
+    # this one thread, so per-call deltas would multiple-count whatever
+    # other calls were in flight — only sample this around whole batches.
+    return time.thread_time_ns()
+
+async def measure_call(client, url, hist=None):
+    # Only network I/O sits between the timestamps: the body is encoded
+    # once at module scope and the status check happens after the timer
+    # stops, so neither contaminates the measurement. Streaming lets us
+    # snapshot TTFB (status line + headers on the wire) before draining
+    # the body, so response size doesn't pollute the latency signal.
+    w0 = _now()
     try:
-        response = requests.post(url, json=payload, headers=headers, timeout=30)
-        response.raise_for_status()
+        async with client.stream("POST", url, content=BODY, headers=headers) as response:
+            w_first = _now()
+            await response.aread()
     except Exception as e:
         print(f"Error calling {url}: {e}")
         return None
-    return (time.perf_counter() - start) * 1000  # ms
-
-print(f"🔬 Starting latency benchmark ({NUM_TESTS} calls each)...")
-
-direct_times = []
-proxy_times = []
-
-for i in range(NUM_TESTS):
-    # Direct
-    t_direct = measure_call(DIRECT_URL)
-    if t_direct: direct_times.append(t_direct)
-    
-    # Proxy
-    t_proxy = measure_call(SENTINEL_URL)
-    if t_proxy: proxy_times.append(t_proxy)
-    
-    print(f"Step {i+1}: Direct={t_direct:.1f}ms | Proxy={t_proxy:.1f}ms")
-
-if direct_times and proxy_times:
-    avg_direct = statistics.mean(direct_times)
-    avg_proxy = statistics.mean(proxy_times)
-    overhead = avg_proxy - avg_direct
-    
-    print("\n--- RESULTS ---")
-    print(f"Average Direct Latency: {avg_direct:.2f}ms")
-    print(f"Average Proxy Latency:  {avg_proxy:.2f}ms")
-    print(f"Sentinel Overhead:      {overhead:.2f}ms")
-    print(f"p95 Proxy Latency:      {statistics.quantiles(proxy_times, n=20)[18]:.2f}ms")
-    
-    if overhead < 20:
-        print("\n✅ Performance is within expected production limits (<20ms overhead).")
-else:
-    print("\n❌ Benchmark failed due to API errors.")
+    w1 = _now()
+    if response.status_code >= 400:
+        print(f"Error calling {url}: HTTP {response.status_code}")
+        return None
+    if hist is not None:
+        hist.record_value((w1 - w0) // 1000)  # µs buckets, total wall
+    # ttfb_ms is the user-relevant chat metric; wall_ms additionally
+    # includes the body download; size_b is the wire size of the body — a
+    # "fast" proxy that only returned a tiny error page shows up here.
+    return ((w_first - w0) / 1e6, (w1 - w0) / 1e6, len(response.content))
+
+async def run_probe(client, url, i, ttfb, wall, size, hist):
+    result = await measure_call(client, url, hist)
+    if result is not None:
+        ttfb[i], wall[i], size[i] = result
+
+async def main():
+    print(f"🔬 Starting latency benchmark ({NUM_TESTS} concurrent calls each)...")
+
+    # One shared-config AsyncClient with http2=True: N in-flight probes to
+    # Sentinel ride as streams on a single multiplexed connection (one
+    # socket, no per-request handshake) when the server speaks h2, and
+    # negotiation falls back to pooled keep-alive HTTP/1.1 transparently
+    # when it doesn't. api.openai.com is resolved once when its connection
+    # is established and kept alive for the whole run.
+    async with sentinel_client.new_async_client() as client:
+        # Warmup burn-in: discard the first WARMUP calls per URL so the
+        # measured samples don't include handshakes, DNS or cold pools.
+        await asyncio.gather(
+            *[measure_call(client, DIRECT_URL) for _ in range(WARMUP)],
+            *[measure_call(client, SENTINEL_URL) for _ in range(WARMUP)],
+        )
+
+        # Fire both batches concurrently: wall time is ~max(t_direct, t_proxy)
+        # instead of NUM_TESTS * (t_direct + t_proxy), and both endpoints are
+        # sampled over the same time window (no network-drift confound).
+        direct_hist = new_histogram()
+        proxy_hist = new_histogram()
+        direct_ttfb, direct_wall, direct_size = (new_samples() for _ in range(3))
+        proxy_ttfb, proxy_wall, proxy_size = (new_samples() for _ in range(3))
+        # Thread CPU is sampled once around the whole batch: the probes
+        # overlap on one event-loop thread, so only the aggregate (and a
+        # per-call average) is attributable to the client side.
+        cpu0 = _cpu()
+        await asyncio.gather(
+            asyncio.gather(*[run_probe(client, DIRECT_URL, i, direct_ttfb, direct_wall, direct_size, direct_hist)
+                             for i in range(NUM_TESTS)]),
+            asyncio.gather(*[run_probe(client, SENTINEL_URL, i, proxy_ttfb, proxy_wall, proxy_size, proxy_hist)
+                             for i in range(NUM_TESTS)]),
+        )
+        batch_cpu_ms = (_cpu() - cpu0) / 1e6
+
+    # Failed calls are still NaN; mask them out in one vectorized pass.
+    ok_direct = np.isfinite(direct_wall)
+    ok_proxy = np.isfinite(proxy_wall)
+
+    for i in range(NUM_TESTS):
+        d = f"ttfb {direct_ttfb[i]:.1f}/total {direct_wall[i]:.1f}ms" if ok_direct[i] else "FAIL"
+        p = f"ttfb {proxy_ttfb[i]:.1f}/total {proxy_wall[i]:.1f}ms" if ok_proxy[i] else "FAIL"
+        print(f"Step {i+1}: Direct={d} | Proxy={p}")
+
+    if ok_direct.any() and ok_proxy.any():
+        avg_direct = direct_wall[ok_direct].mean()
+        avg_proxy = proxy_wall[ok_proxy].mean()
+        overhead = avg_proxy - avg_direct
+
+        print("\n--- RESULTS ---")
+        print(f"Average Direct TTFB:    {direct_ttfb[ok_direct].mean():.2f}ms")
+        print(f"Average Proxy TTFB:     {proxy_ttfb[ok_proxy].mean():.2f}ms")
+        print(f"Average Direct Latency: {avg_direct:.2f}ms")
+        print(f"Average Proxy Latency:  {avg_proxy:.2f}ms")
+        print(f"Sentinel Overhead:      {overhead:.2f}ms")
+        n_calls = int(ok_direct.sum() + ok_proxy.sum())
+        print(f"Client CPU:             {batch_cpu_ms:.2f}ms across {n_calls} calls ({batch_cpu_ms / n_calls:.3f}ms/call avg)")
+        # Throughput puts latency in context: identical latencies with very
+        # different body sizes mean very different effective speeds.
+        d_size, p_size = direct_size[ok_direct], proxy_size[ok_proxy]
+        d_mbps = d_size.sum() / (direct_wall[ok_direct].sum() / 1000) / 1e6
+        p_mbps = p_size.sum() / (proxy_wall[ok_proxy].sum() / 1000) / 1e6
+        print(f"Avg response size:      direct {d_size.mean():.0f} B | proxy {p_size.mean():.0f} B")
+        print(f"Throughput:             direct {d_mbps:.3f} MB/s | proxy {p_mbps:.3f} MB/s")
+        print_summary("Direct", direct_wall[ok_direct])
+        print_summary("Proxy ", proxy_wall[ok_proxy])
+        print_percentiles("Direct", direct_hist)
+        print_percentiles("Proxy ", proxy_hist)
+
+        if overhead < 20:
+            print("\n✅ Performance is within expected production limits (<20ms overhead).")
+    else:
+        print("\n❌ Benchmark failed due to API errors.")
+
+if __name__ == "__main__":
+    stabilize_environment()
+    asyncio.run(main())
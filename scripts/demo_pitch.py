@@ -1,7 +1,9 @@
-import requests
+import asyncio
 import time
 import sys
 
+import sentinel_client
+
 # Terminal Colors
 BLUE = "\033[94m"
 GREEN = "\033[92m"
@@ -10,17 +12,30 @@ RED = "\033[91m"
 BOLD = "\033[1m"
 RESET = "\033[0m"
 
-SENTINEL_URL = "http://localhost:3000/v1/chat/completions"
+# All ANSI-heavy lines are assembled once at import; per-iteration prints
+# only fill in the varying values instead of re-interpolating the color
+# constants every time.
+BANNER = (f"{BOLD}{BLUE}" + "="*50 + "\n"
+          "      🛡️  SENTINEL: AI PERFORMANCE FIREWALL\n"
+          + "="*50 + f"{RESET}\n")
+AGENT_TEMPLATE = f"{YELLOW}[Agent]{RESET} Attempting Action {{}}: {{}}"
+PASS_TEMPLATE = f"{BLUE}[Sentinel]{RESET} Request passing... (Latency: {{:.2f}}ms)"
+INTERVENTION_LINE = f"\n{BOLD}{RED}[!!!] SENTINEL INTERVENTION DETECTED [!!!]{RESET}"
+REASON_TEMPLATE = f"{RED}Reason:{RESET} {{}}"
+LATENCY_TEMPLATE = f"{GREEN}Latency Overhead:{RESET} {{:.2f}}ms"
+SAVINGS_HEADER = f"\n{BOLD}{GREEN}💰 SAVINGS DEMONSTRATED:{RESET}"
+STATUS_LINE = f"Status: {BOLD}Thread Terminated Safely.{RESET}"
+FOOTER = f"\n{BLUE}" + "="*50 + f"{RESET}"
+ERROR_LINE = f"{RED}Error connecting to Sentinel. Make sure it's running!{RESET}"
+NOT_INTERCEPTED_LINE = f"\n{RED}❌ Loop not intercepted. Check sensitivity settings.{RESET}"
 
 def print_banner():
-    print(f"{BOLD}{BLUE}" + "="*50)
-    print("      🛡️  SENTINEL: AI PERFORMANCE FIREWALL")
-    print("="*50 + f"{RESET}\n")
+    print(BANNER)
 
-def simulate_loop():
+async def simulate_loop():
     print_banner()
     session_id = f"pitch-demo-{int(time.time())}"
-    
+
     # Intentional loop messages with higher word overlap
     messages = [
         "Analyzing system logs for root cause analysis.",
@@ -29,50 +44,59 @@ def simulate_loop():
         "Analyzing system logs. Final pass on root cause analysis."
     ]
 
+    # Encode every payload up front with orjson so no serialization work
+    # happens inside the paced loop.
+    bodies = [
+        sentinel_client.encode({
+            "model": "llama-3.3-70b-versatile", # Groq-powered for fast demo
+            "messages": [{"role": "user", "content": msg}],
+        })
+        for msg in messages
+    ]
+
     total_waste_prevented = 0.0
-    
+
     print(f"{BOLD}Step 1: Simulating an AI Agent going into a loop...{RESET}")
-    print(f"Targeting Sentinel Proxy at: {SENTINEL_URL}\n")
-
-    for i, msg in enumerate(messages):
-        time.sleep(1)
-        print(f"{YELLOW}[Agent]{RESET} Attempting Action {i+1}: {msg}")
-        
-        try:
-            payload = {
-                "model": "llama-3.3-70b-versatile", # Groq-powered for fast demo
-                "messages": [{"role": "user", "content": msg}],
-            }
-            headers = {"x-sentinel-session": session_id}
-            
-            start = time.time()
-            response = requests.post(SENTINEL_URL, json=payload, headers=headers)
-            latency = (time.time() - start) * 1000
-            
-            data = response.json()
-            content = data['choices'][0]['message']['content']
-
-            if "SENTINEL" in content:
-                print(f"\n{BOLD}{RED}[!!!] SENTINEL INTERVENTION DETECTED [!!!]{RESET}")
-                print(f"{RED}Reason:{RESET} {content}")
-                print(f"{GREEN}Latency Overhead:{RESET} {latency:.2f}ms")
-                
-                # Business logic: Every loop blocked saves roughly $0.05 - $0.50 in compute/tokens
-                total_waste_prevented += 0.50 
-                
-                print(f"\n{BOLD}{GREEN}💰 SAVINGS DEMONSTRATED:{RESET}")
-                print(f"Prevented Runaway Cost: ${total_waste_prevented:.2f}")
-                print(f"Status: {BOLD}Thread Terminated Safely.{RESET}")
-                print(f"\n{BLUE}" + "="*50 + f"{RESET}")
+    print(f"Targeting Sentinel Proxy at: {sentinel_client.CHAT_URL}\n")
+
+    # One shared keep-alive client for the whole demo; the 1s pacing sleep
+    # no longer blocks the event loop, so connection upkeep and any future
+    # concurrent sessions overlap with it.
+    demo_headers = sentinel_client.build_headers(session=session_id)
+    async with sentinel_client.new_async_client() as client:
+        for i, (msg, body) in enumerate(zip(messages, bodies)):
+            await asyncio.sleep(1)
+            print(AGENT_TEMPLATE.format(i + 1, msg))
+
+            try:
+                start = time.perf_counter_ns()  # monotonic, immune to NTP jumps
+                response = await client.post(sentinel_client.CHAT_PATH, content=body, headers=demo_headers)
+                latency = (time.perf_counter_ns() - start) / 1e6
+
+                # The intervention header is set before the body: passing
+                # requests never pay for a JSON decode here.
+                if sentinel_client.is_intervention(response):
+                    reason = response.json()['choices'][0]['message']['content']
+                    print(INTERVENTION_LINE)
+                    print(REASON_TEMPLATE.format(reason))
+                    print(LATENCY_TEMPLATE.format(latency))
+
+                    # Business logic: Every loop blocked saves roughly $0.05 - $0.50 in compute/tokens
+                    total_waste_prevented += 0.50
+
+                    print(SAVINGS_HEADER)
+                    print(f"Prevented Runaway Cost: ${total_waste_prevented:.2f}")
+                    print(STATUS_LINE)
+                    print(FOOTER)
+                    return
+                else:
+                    print(PASS_TEMPLATE.format(latency))
+
+            except Exception as e:
+                print(ERROR_LINE)
                 return
-            else:
-                print(f"{BLUE}[Sentinel]{RESET} Request passing... (Latency: {latency:.2f}ms)")
-                
-        except Exception as e:
-            print(f"{RED}Error connecting to Sentinel. Make sure it's running!{RESET}")
-            return
 
-    print(f"\n{RED}❌ Loop not intercepted. Check sensitivity settings.{RESET}")
+    print(NOT_INTERCEPTED_LINE)
 
 if __name__ == "__main__":
-    simulate_loop()
+    asyncio.run(simulate_loop())
@@ -0,0 +1,46 @@
+"""Shared HTTP plumbing for the Sentinel scripts.
+
+benchmark.py, demo_pitch.py and test_sentinel.py all talk to the proxy
+through the clients and helpers here, so the base URL, HTTP/2 pooling,
+orjson encoding and header conventions live in exactly one place.
+"""
+import httpx
+import orjson
+
+# 127.0.0.1 instead of localhost so no DNS lookup happens per call.
+BASE_URL = "http://127.0.0.1:3000"
+CHAT_PATH = "/v1/chat/completions"
+CHAT_URL = BASE_URL + CHAT_PATH
+HEALTH_URL = BASE_URL + "/health"
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+TIMEOUT = 30.0
+
+# Shared thread-safe singleton with http2=True: concurrent callers
+# multiplex as streams over one TCP connection when Sentinel speaks h2,
+# and fall back to pooled keep-alive HTTP/1.1 transparently when it
+# doesn't.
+client = httpx.Client(base_url=BASE_URL, http2=True, limits=LIMITS, timeout=TIMEOUT)
+
+def new_async_client():
+    """Same configuration as the singleton, for the asyncio scripts."""
+    return httpx.AsyncClient(base_url=BASE_URL, http2=True, limits=LIMITS, timeout=TIMEOUT)
+
+def encode(payload):
+    return orjson.dumps(payload)
+
+def build_headers(session=None, extra_headers=None):
+    headers = dict(JSON_HEADERS)
+    if session:
+        headers["x-sentinel-session"] = session
+    headers.update(extra_headers or {})
+    return headers
+
+def chat(messages, model, session=None, extra_headers=None):
+    body = encode({"model": model, "messages": messages})
+    return client.post(CHAT_PATH, content=body, headers=build_headers(session, extra_headers))
+
+def is_intervention(response):
+    return "x-sentinel-intervention" in response.headers
@@ -4,7 +4,7 @@ use axum::{
     Json,
     response::{IntoResponse, Response},
     extract::State,
-    http::{HeaderMap, StatusCode},
+    http::{HeaderMap, HeaderValue, StatusCode},
 };
 use std::sync::Arc;
 use tokio::net::TcpListener;
@@ -231,32 +231,51 @@ async fn chat_completions(
         _ => ("https://api.openai.com/v1/chat/completions", state.openai_api_key.clone()),
     };
 
-    let prompt_to_check = payload.messages.last()
-        .map(|m| m.content.clone())
-        .unwrap_or_default();
+    // Normally only the newest message goes through the detector (clients
+    // resend the whole conversation every turn, so older ones are already
+    // in the session history). With x-sentinel-batch-probe set, every user
+    // message in the payload is walked through the detector in order —
+    // lets probes batch N turns into one round-trip.
+    let prompts_to_check: Vec<String> = if headers.contains_key("x-sentinel-batch-probe") {
+        payload.messages.iter()
+            .filter(|m| m.role == "user")
+            .map(|m| m.content.clone())
+            .collect()
+    } else {
+        payload.messages.last()
+            .map(|m| m.content.clone())
+            .into_iter()
+            .collect()
+    };
+    let prompt_to_check = prompts_to_check.last().cloned().unwrap_or_default();
 
     // 1. Loop Detection
     let mut is_loop = false;
     let mut reason = String::new();
-    let emb_result = get_emb_final_v4(&state.client, &state.openai_api_key, &prompt_to_check).await;
-    
-    {
+
+    for prompt in &prompts_to_check {
+        let emb_result = get_emb_final_v4(&state.client, &state.openai_api_key, prompt).await;
+
         let mut sess = state.sessions.entry(session_id.clone()).or_insert_with(|| SessionState::new());
         let val = sess.value_mut();
-        
+
         if let Ok(emb) = emb_result {
             if val.check_loop(Embedding(emb), 0.20, 3) {
                 is_loop = true;
                 reason = "Semantic Loop Detected (Vector Similarity)".to_string();
             }
         }
-        
+
         if !is_loop {
-            if val.check_basic_loop(prompt_to_check.clone(), 0.80, 3) {
+            if val.check_basic_loop(prompt.clone(), 0.80, 3) {
                 is_loop = true;
                 reason = "Fuzzy Overlap Detected (String Repetition)".to_string();
             }
         }
+
+        if is_loop {
+            break;
+        }
     }
 
     if is_loop {
@@ -283,7 +302,7 @@ async fn chat_completions(
                 "finish_reason": "stop"
             }]
         });
-        return (StatusCode::OK, Json(error_body)).into_response();
+        return intervention_response(StatusCode::OK, error_body);
     }
 
     // 2. Forward
@@ -303,6 +322,7 @@ async fn chat_completions(
                 return (status, Json(body)).into_response();
             }
 
+            let mut throttled = false;
             if let Some(content) = body["choices"][0]["message"]["content"].as_str() {
                 let content_str = content.to_string();
                 
@@ -318,7 +338,7 @@ async fn chat_completions(
                         savings_est: 0.10,
                     });
                     
-                    return (status, Json(body)).into_response();
+                    return intervention_response(status, body);
                 }
 
                 if let Some(mut sess) = state.sessions.get_mut(&session_id) {
@@ -330,8 +350,9 @@ async fn chat_completions(
                     }
                     
                     if sess.check_economic_throttle(cost) {
+                        throttled = true;
                         body["choices"][0]["message"]["content"] = serde_json::json!("🛑 SENTINEL: Gasto excesivo detectado.");
-                        
+
                         let mut logs = state.audit_logs.lock().await;
                         logs.push_back(InterventionLog {
                             timestamp: std::time::SystemTime::now().duration_since(std::time::UNIX_EPOCH).unwrap().as_secs(),
@@ -345,12 +366,25 @@ async fn chat_completions(
                     sess.last_cost = cost;
                 }
             }
-            (status, Json(body)).into_response()
+            if throttled {
+                intervention_response(status, body)
+            } else {
+                (status, Json(body)).into_response()
+            }
         }
         Err(_) => (StatusCode::INTERNAL_SERVER_ERROR, "Proxy error").into_response(),
     }
 }
 
+// Interventions are signalled via a response header so clients can branch
+// without decoding the body (substring-matching "SENTINEL" in the content
+// was fragile and forced a full JSON parse on every call).
+fn intervention_response(status: StatusCode, body: serde_json::Value) -> Response {
+    let mut res = (status, Json(body)).into_response();
+    res.headers_mut().insert("x-sentinel-intervention", HeaderValue::from_static("1"));
+    res
+}
+
 // --- MCP HANDLER ---
 
 async fn mcp_handler(